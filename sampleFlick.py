@@ -1,36 +1,116 @@
 
+import asyncio
+import queue
+import shutil
+import signal
 import subprocess
-import time
-import keyboard
+import sys
+import threading
 import json
+import logging
 import os
 import socket
-from threading import Thread, Event
-from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
+import ctypes
+from ctypes import cast, POINTER, wintypes
+
+# comtypes initializes COM on the importing thread when first imported - make that
+# the multithreaded apartment, the same one the audio worker thread joins
+sys.coinit_flags = 0  # COINIT_MULTITHREADED
+
+from comtypes import CLSCTX_ALL, COINIT_MULTITHREADED, CoInitializeEx, CoUninitialize
 from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
 
+logger = logging.getLogger("kiosk")
+
+# Prefix of the named pipe the persistent MPV instance listens on for JSON IPC commands.
+# Each controller appends its PID so a leftover MPV or a second copy can never own our pipe
+MPV_IPC_PIPE_PREFIX = r"\\.\pipe\mpv_kiosk"
+
+# Launch MPV detached from our console, so no console is attached or allocated for it.
+# (CREATE_NO_WINDOW would be ignored alongside DETACHED_PROCESS, so it is not passed)
+MPV_CREATION_FLAGS = 0
+if sys.platform == "win32":
+    MPV_CREATION_FLAGS = subprocess.DETACHED_PROCESS
+
+# Win32 RegisterHotKey constants
+MOD_ALT = 0x0001
+MOD_CONTROL = 0x0002
+MOD_NOREPEAT = 0x4000
+WM_QUIT = 0x0012
+WM_HOTKEY = 0x0312
+
+# Console control events that terminate the process as soon as the handler returns
+CTRL_CLOSE_EVENT = 2
+CTRL_LOGOFF_EVENT = 5
+CTRL_SHUTDOWN_EVENT = 6
+
+# RegisterHotKey id -> (reactor hotkey name, virtual key); all are Ctrl+Alt chords
+HOTKEYS = {
+    1: ("toggle", ord('D')),
+    2: ("stop", ord('E')),
+    3: ("restart", ord('R')),
+}
+
+# MPV path that last launched successfully, so later starts can skip the search
+MPV_CACHE_FILE = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")),
+                              "orh-kiosk", "mpv_path.json")
+
 class FlicMPVController:
     def __init__(self, carescape_video_path, demo_video_path):
         self.carescape_video = carescape_video_path
         self.demo_video = demo_video_path
+        
+        # Stat and split the video paths once - run() and the switch logging reuse these
+        self.carescape_basename = os.path.basename(carescape_video_path)
+        self.demo_basename = os.path.basename(demo_video_path)
+        self.basenames = {carescape_video_path: self.carescape_basename, demo_video_path: self.demo_basename}
+        self.carescape_exists = os.path.isfile(carescape_video_path)
+        self.demo_exists = os.path.isfile(demo_video_path)
+        
+        # MPV is launched with both videos as its playlist; switches jump between the two entries
+        self.carescape_idx = 0
+        self.demo_idx = 1
+        self.playlist_index = {self.carescape_video: self.carescape_idx, self.demo_video: self.demo_idx}
+        
+        # The only (video, loop) combinations ever played - their launch commands and switch
+        # payloads are built once rather than on every keypress
+        self.playback_modes = ((self.carescape_video, True), (self.demo_video, False))
+        self._cmds = {}
+        self._switch_payloads = {mode: self.switch_payload(*mode) for mode in self.playback_modes}
+        
         self.mpv_process = None
-        self.is_demo_playing = False
-        self.stop_monitoring = Event()
+        self.ipc_pipe = f"{MPV_IPC_PIPE_PREFIX}_{os.getpid()}"
+        self.ipc_writer = None
         self.mpv_exe = None
+        self.mpv_exe_cached = False
+        
+        # Reactor state - only ever touched by handlers dispatched from reactor()
+        self.loop = None
+        self.events = None
+        self.hotkey_thread = None
+        self.hotkey_thread_id = None
+        self.hotkey_failures = []
+        self.stop_event = None
+        self.stopped = threading.Event()
+        self.console_handler = None
+        self.tasks = set()
+        self.is_demo_playing = False
+        self.hotkey_handlers = {
+            "toggle": self.flic_button_pressed,
+            "stop": self.stop_mpv,
+            "restart": self.restart_carescape,
+        }
         
         self.carescape_volume = 50
         self.demo_volume = 75
         
+        # Owned by the audio worker thread - every pycaw call runs there, queued via audio_queue
         self.volume_control = None
-        try:
-            devices = AudioUtilities.GetSpeakers()
-            interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-            self.volume_control = cast(interface, POINTER(IAudioEndpointVolume))
-            print("✅ Windows audio control initialized")
-        except Exception as e:
-            print(f"⚠️  Warning: Could not initialize audio control: {e}")
-            print("   Volume control will be disabled")
+        self.audio_queue = queue.Queue()
+        self.audio_thread = None
+        
+        # Scalars for the levels used on every switch, so set_volume does no math on the hot path
+        self._vol_scalars = {v: v / 100.0 for v in (self.carescape_volume, self.demo_volume)}
             
         # Load configuration
         self.config = self.load_config()
@@ -47,110 +127,178 @@ class FlicMPVController:
                 try:
                     with open(path, 'r') as f:
                         config = json.load(f)
-                        print(f"✅ Loaded configuration from {path}")
+                        logger.info("✅ Loaded configuration from %s", path)
                         return config
                 except Exception as e:
-                    print(f"⚠️  Error loading config from {path}: {e}")
+                    logger.warning("⚠️  Error loading config from %s: %s", path, e)
         
         return None
         
     def find_mpv(self):
-        """Find MPV executable in common locations"""
-        mpv_paths = []
+        """Find MPV executable - cached path first, then config and common locations"""
+        configured_path = None
         
         # Check config first
         if self.config:
             try:
                 # Check nested structure matching C# app: kiosk.videoMode.mpvPath
-                mpv_path = self.config.get('kiosk', {}).get('videoMode', {}).get('mpvPath')
+                configured_path = self.config.get('kiosk', {}).get('videoMode', {}).get('mpvPath')
                 
                 # Also check simple structure: mpv_path
-                if not mpv_path:
-                    mpv_path = self.config.get('mpv_path')
-                    
-                if mpv_path:
-                    mpv_paths.append(mpv_path)
+                if not configured_path:
+                    configured_path = self.config.get('mpv_path')
             except:
                 pass
+                
+        cached_path = self.load_cached_mpv()
+        if cached_path and (not configured_path or configured_path == cached_path):
+            self.mpv_exe = cached_path
+            self.mpv_exe_cached = True
+            logger.info("✅ Using cached MPV path: %s", cached_path)
+            return True
+        
+        mpv_paths = []
+        if configured_path:
+            mpv_paths.append(configured_path)
         
         mpv_paths.extend([
             "mpv",
-            r"C:\Users\CareWall\Downloads\mpv-x86_64-v3-20251012-git-ad59ff1",
+            r"C:\Users\CareWall\Downloads\mpv-x86_64-v3-20251012-git-ad59ff1\mpv.exe",
             r"C:\Users\CareWall\Downloads\mpv-x86_64-v3-20251012-git-ad59ff1\mpv-x86_64-v3-20251012-git-ad59ff1\mpv.exe",
             r"C:\Users\CareWall\Downloads\mpv\mpv.exe",
-            r"C:\Users\CareWall\Downloads\mpv-x86_64-v3-20251012-git-ad59ff1"
             r"C:\mpv\mpv.exe",
             r"C:\mpv\bin\mpv.exe",
             r"C:\Program Files\mpv\mpv.exe", 
             r"C:\Program Files (x86)\mpv\mpv.exe",
             r"C:\Users\CareWall\Desktop\Demo\mpv\mpv.exe",
-        ]
+        ])
 
+        # Existence is enough here - a broken executable shows up when start_mpv launches it
         for path in mpv_paths:
-            print(f"🔍 Checking: {path}")
+            logger.debug("🔍 Checking: %s", path)
             if path == "mpv":
-                try:
-                    result = subprocess.run([path, "--version"], 
-                                          capture_output=True, 
-                                          timeout=5, 
-                                          text=True)
-                    if result.returncode == 0:
-                        self.mpv_exe = path
-                        print(f"✅ Found MPV in PATH: {path}")
-                        return True
-                except Exception as e:
-                    print(f"❌ Not in PATH: {path} - {e}")
-            elif os.path.exists(path):
-                try:
-                    result = subprocess.run([path, "--version"], 
-                                          capture_output=True, 
-                                          timeout=5,
-                                          text=True)
-                    if result.returncode == 0:
-                        self.mpv_exe = path
-                        print(f"✅ Found working MPV at: {path}")
-                        return True
-                except Exception as e:
-                    print(f"❌ Found but not working: {path} - {e}")
+                resolved = shutil.which(path)
+                if resolved:
+                    self.mpv_exe = resolved
+                    logger.info("✅ Found MPV in PATH: %s", resolved)
+                    return True
+                logger.debug("❌ Not in PATH: %s", path)
+            elif os.path.isfile(path):
+                self.mpv_exe = path
+                logger.info("✅ Found MPV at: %s", path)
+                return True
             else:
-                print(f"❌ Not found: {path}")
+                logger.debug("❌ Not found: %s", path)
         
-        print("❌ MPV not found in any common locations")
+        logger.error("❌ MPV not found in any common locations")
         print("\n💡 Please:")
         print("   1. Download MPV from: https://sourceforge.net/projects/mpv-player-windows/files/")
         print("   2. Extract to C:\\mpv\\ so you have C:\\mpv\\mpv.exe")
         print("   3. Or add MPV to your system PATH")
         return False
     
+    def load_cached_mpv(self):
+        """Return the cached MPV path if the file still exists"""
+        try:
+            with open(MPV_CACHE_FILE, 'r') as f:
+                path = json.load(f)["mpv"]
+            return path if os.path.isfile(path) else None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def save_cached_mpv(self, path):
+        """Remember an MPV path that launched successfully for the next start"""
+        try:
+            os.makedirs(os.path.dirname(MPV_CACHE_FILE), exist_ok=True)
+            with open(MPV_CACHE_FILE, 'w') as f:
+                json.dump({"mpv": path}, f)
+            self.mpv_exe_cached = True
+        except OSError as e:
+            logger.warning("⚠️  Could not cache MPV path: %s", e)
+    
+    def forget_cached_mpv(self):
+        """Drop the cached MPV path after it failed to launch, so the next start searches again"""
+        if self.mpv_exe_cached:
+            try:
+                os.remove(MPV_CACHE_FILE)
+            except OSError:
+                pass
+            self.mpv_exe_cached = False
+    
+    def reject_mpv_exe(self):
+        """Drop an MPV executable that failed to launch, so the next start_mpv searches again"""
+        self.forget_cached_mpv()
+        self.mpv_exe = None
+        self._cmds = {}
+    
+    def start_audio_worker(self):
+        """Start the audio worker thread and wait until it has acquired the speaker endpoint"""
+        ready = threading.Event()
+        self.audio_thread = threading.Thread(target=self.audio_worker, args=(ready,), daemon=True)
+        self.audio_thread.start()
+        ready.wait()
+    
+    def audio_worker(self, ready):
+        """Audio thread - join the COM MTA, acquire the endpoint volume, then run queued calls"""
+        com_initialized = False
+        try:
+            CoInitializeEx(COINIT_MULTITHREADED)
+            com_initialized = True
+            self.volume_control = self.acquire_endpoint_volume()
+            logger.info("✅ Windows audio control initialized")
+        except Exception as e:
+            logger.warning("⚠️  Could not initialize audio control, volume control will be disabled: %s", e)
+        finally:
+            ready.set()
+            
+        while True:
+            func = self.audio_queue.get()
+            if func is None:
+                break
+            try:
+                func()
+            except Exception as e:
+                logger.warning("⚠️  Failed to set volume: %s", e)
+                
+        # Release the endpoint before tearing down the apartment it lives in
+        self.volume_control = None
+        if com_initialized:
+            CoUninitialize()
+    
+    def acquire_endpoint_volume(self):
+        """Audio thread - activate the speaker IAudioEndpointVolume"""
+        # Kept out of audio_worker so the device and interface temporaries are released on return,
+        # leaving volume_control as the only COM reference the worker holds
+        devices = AudioUtilities.GetSpeakers()
+        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+        return cast(interface, POINTER(IAudioEndpointVolume))
+    
+    def stop_audio_worker(self):
+        """Stop the audio worker thread once queued calls have run"""
+        if self.audio_thread and self.audio_thread.is_alive():
+            self.audio_queue.put(None)
+            self.audio_thread.join(timeout=1)
+        self.audio_thread = None
+    
     def set_volume(self, volume_percent):
-        """Set Windows system volume to specified percentage (0-100)"""
+        """Set Windows system volume to specified percentage (0-100) - queued to the audio thread"""
         if not self.volume_control:
-            print(f"⚠️  Cannot set volume - audio control not available")
+            logger.debug("⚠️  Cannot set volume - audio control not available")
             return False
             
-        try:
+        volume_scalar = self._vol_scalars.get(volume_percent)
+        if volume_scalar is None:
             volume_scalar = volume_percent / 100.0
-            self.volume_control.SetMasterVolumeLevelScalar(volume_scalar, None)
-            print(f"🔊 Volume set to {volume_percent}%")
-            return True
-        except Exception as e:
-            print(f"⚠️  Failed to set volume: {e}")
-            return False
-        
-    def start_mpv(self, video_path, loop=True, volume=None):
-        """Start MPV with specified video and optional volume"""
-        if not self.mpv_exe:
-            if not self.find_mpv():
-                return False
+        self.audio_queue.put(lambda: self.apply_volume(volume_scalar, volume_percent))
+        return True
+    
+    def apply_volume(self, volume_scalar, volume_percent):
+        """Audio thread - set the master volume scalar"""
+        self.volume_control.SetMasterVolumeLevelScalar(volume_scalar, None)
+        logger.debug("🔊 Volume set to %s%%", volume_percent)
         
-        target_volume = None
-        if volume is not None:
-            target_volume = volume
-        elif video_path == self.carescape_video:
-            target_volume = self.carescape_volume
-        elif video_path == self.demo_video:
-            target_volume = self.demo_volume
-            
+    def mpv_command(self, video_path, loop):
+        """Build the MPV launch command starting on the given playlist entry"""
         cmd = [
             self.mpv_exe,
             "--fullscreen",
@@ -160,229 +308,492 @@ class FlicMPVController:
             "--screen=0",
             "--fs-screen=0",
             "--quiet",
-            video_path
+            # Keep MPV (and its window) alive between videos - switches are IPC playlist jumps
+            "--idle=yes",
+            "--force-window=yes",
+            f"--input-ipc-server={self.ipc_pipe}",
+            # Open the upcoming playlist entry ahead of time and keep demuxed data cached
+            "--prefetch-playlist=yes",
+            "--cache=yes",
+            "--demuxer-max-bytes=64M",
+            f"--playlist-start={self.playlist_index[video_path]}",
         ]
         
         if loop:
-            cmd.insert(-1, "--loop-file=inf")
-            
-        try:
-            print(f"🚀 Starting MPV on second monitor with: {os.path.basename(video_path)}")
-            new_process = subprocess.Popen(cmd, 
-                                         stdout=subprocess.DEVNULL, 
-                                         stderr=subprocess.PIPE,
-                                         text=True)
+            cmd.append("--loop-file=inf")
             
-            time.sleep(0.3)
+        cmd.extend([self.carescape_video, self.demo_video])
+        return tuple(cmd)
+    
+    def build_mpv_commands(self):
+        """Precompute the launch command for each playback mode once the MPV executable is known"""
+        self._cmds = {mode: self.mpv_command(*mode) for mode in self.playback_modes}
+    
+    async def start_mpv(self, video_path, loop=True):
+        """Launch the persistent MPV instance on the given video and connect to its IPC pipe"""
+        if not self.mpv_exe:
+            if not self.find_mpv():
+                return False
+        if not self._cmds:
+            self.build_mpv_commands()
             
-            if self.mpv_process and self.mpv_process.poll() is None:
-                self.mpv_process.terminate()
+        cmd = self._cmds.get((video_path, loop)) or self.mpv_command(video_path, loop)
             
-            self.mpv_process = new_process
-            time.sleep(0.2)
+        try:
+            # Never let two MPV instances (and their decoders) coexist - the old one also owns the pipe
+            if self.mpv_process and self.mpv_process.returncode is None:
+                await self.terminate_mpv()
+                
+            logger.info("🚀 Starting MPV on second monitor with: %s", self.basenames[video_path])
+            try:
+                # close_fds=False avoids the restricted handle-list setup, so MPV inherits every
+                # inheritable handle we hold. Python opens files, sockets and the IPC pipe
+                # non-inheritable (PEP 446), so at spawn time that is only the std handles below -
+                # stdin included, so MPV doesn't get our console input handle
+                process = await asyncio.create_subprocess_exec(*cmd,
+                                                               stdin=subprocess.DEVNULL,
+                                                               stdout=subprocess.DEVNULL,
+                                                               stderr=subprocess.DEVNULL,
+                                                               creationflags=MPV_CREATION_FLAGS,
+                                                               close_fds=False)
+            except OSError as e:
+                logger.error("❌ Could not launch MPV at %s: %s", self.mpv_exe, e)
+                self.reject_mpv_exe()
+                return False
+            self.mpv_process = process
             
-            if self.mpv_process.poll() is not None:
-                _, stderr = self.mpv_process.communicate()
-                print(f"❌ MPV failed to start. Error: {stderr}")
+            if not await self.connect_ipc(process):
+                if process.returncode is None:
+                    logger.error("❌ MPV started but its IPC pipe never became available")
+                    await self.terminate_mpv()
+                else:
+                    logger.error("❌ MPV failed to start (exit code %s)", process.returncode)
+                    self.reject_mpv_exe()
+                self.mpv_process = None
                 return False
             
-            if target_volume is not None:
-                if video_path == self.demo_video and target_volume > self.carescape_volume:
-                    print("⏱️  Delaying volume increase for smooth transition...")
-                    time.sleep(0.5)
-                self.set_volume(target_volume)
+            if not self.mpv_exe_cached:
+                self.save_cached_mpv(self.mpv_exe)
+            self.create_task(self.watch_mpv(process))
+            logger.info("✅ MPV started successfully on second monitor")
+            return True
+            
+        except Exception as e:
+            logger.error("❌ Error starting MPV: %s", e)
+            # Don't leave an MPV running that has no IPC connection or exit watcher
+            if self.mpv_process and self.mpv_process.returncode is None:
+                await self.terminate_mpv()
+            self.close_ipc()
+            self.mpv_process = None
+            return False
+    
+    async def connect_ipc(self, process):
+        """Connect to MPV's IPC pipe, waiting up to ~5s for MPV to create it"""
+        for _ in range(100):
+            if process.returncode is not None:
+                return False
+            try:
+                reader = asyncio.StreamReader()
+                protocol = asyncio.StreamReaderProtocol(reader)
+                transport, _ = await self.loop.create_pipe_connection(lambda: protocol, self.ipc_pipe)
+            except OSError:
+                await asyncio.sleep(0.05)
+                continue
                 
-            print(f"✅ MPV started successfully on second monitor")
+            self.ipc_writer = asyncio.StreamWriter(transport, protocol, reader, self.loop)
+            self.create_task(self.read_ipc(process, reader))
             return True
             
+        return False
+    
+    def close_ipc(self):
+        """Close the IPC pipe to MPV, if open"""
+        if self.ipc_writer:
+            self.ipc_writer.close()
+            self.ipc_writer = None
+    
+    def encode_ipc(self, *commands):
+        """Encode IPC commands as newline-delimited JSON"""
+        return b"".join(json.dumps({"command": command}).encode() + b"\n" for command in commands)
+    
+    def switch_payload(self, video_path, loop):
+        """IPC payload that switches MPV to the given playlist entry"""
+        return self.encode_ipc(["set_property", "loop-file", "inf" if loop else "no"],
+                               ["playlist-play-index", self.playlist_index[video_path]])
+    
+    async def send_ipc(self, payload):
+        """Send an encoded IPC payload to the running MPV instance"""
+        if not self.ipc_writer:
+            return False
+            
+        try:
+            self.ipc_writer.write(payload)
+            await self.ipc_writer.drain()
+            return True
         except Exception as e:
-            print(f"❌ Error starting MPV: {e}")
+            logger.error("❌ MPV IPC write failed: %s", e)
             return False
     
-    def flic_button_pressed(self):
+    async def read_ipc(self, process, reader):
+        """Forward MPV end-file events to the reactor until the pipe closes"""
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+                
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+                
+            # MPV streams many other events (playback-restart, audio-reconfig...) - only end-file matters
+            if message.get("event") == "end-file":
+                self.events.put_nowait(("mpv_event", (process, message)))
+            elif "event" in message:
+                continue
+            elif message.get("error", "success") != "success":
+                logger.warning("⚠️  MPV IPC command failed: %s", message['error'])
+    
+    async def play_video(self, video_path, loop=True, volume=None):
+        """Switch MPV to the specified video and optional volume, launching MPV if it is not running"""
+        target_volume = None
+        if volume is not None:
+            target_volume = volume
+        elif video_path == self.carescape_video:
+            target_volume = self.carescape_volume
+        elif video_path == self.demo_video:
+            target_volume = self.demo_volume
+            
+        if self.mpv_process and self.mpv_process.returncode is None:
+            payload = self._switch_payloads.get((video_path, loop)) or self.switch_payload(video_path, loop)
+            sent = await self.send_ipc(payload)
+            if not sent:
+                return False
+        elif not await self.start_mpv(video_path, loop):
+            return False
+            
+        if target_volume is not None:
+            if video_path == self.demo_video and target_volume > self.carescape_volume:
+                logger.debug("⏱️  Delaying volume increase for smooth transition...")
+                await asyncio.sleep(0.5)
+            self.set_volume(target_volume)
+            
+        return True
+    
+    async def flic_button_pressed(self):
         """Handle Flic button press (Ctrl+Alt+D) - toggle between demo and carescape video"""
         
         if self.is_demo_playing:
-            print("🔴 Flic button pressed! Returning to carescape video...")
-            print(f"🎬 Switching back to: {os.path.basename(self.carescape_video)}")
+            logger.debug("🔴 Flic button pressed! Returning to carescape video...")
+            logger.debug("🎬 Switching back to: %s", self.carescape_basename)
             
-            self.stop_monitoring.set()
-            
-            success = self.start_mpv(self.carescape_video, loop=True)
+            success = await self.play_video(self.carescape_video, loop=True)
             if success:
-                print("✅ Successfully returned to carescape video")
+                logger.debug("✅ Successfully returned to carescape video")
                 self.is_demo_playing = False
-                self.stop_monitoring.clear()
             else:
-                print("❌ Failed to return to carescape video")
+                logger.error("❌ Failed to return to carescape video")
                 
         else:
-            print("🔴 Flic button pressed! Playing demo video...")
-            print(f"🎬 Switching to: {os.path.basename(self.demo_video)}")
+            logger.debug("🔴 Flic button pressed! Playing demo video...")
+            logger.debug("🎬 Switching to: %s", self.demo_basename)
             
             self.is_demo_playing = True
             
-            success = self.start_mpv(self.demo_video, loop=False)
+            success = await self.play_video(self.demo_video, loop=False)
                 
             if success:
-                print("👀 Starting demo monitor thread...")
-                monitor_thread = Thread(target=self.monitor_demo_end)
-                monitor_thread.daemon = True
-                monitor_thread.start()
+                logger.debug("👀 Waiting for demo video to finish...")
             else:
-                print("❌ Failed to start demo video, resetting state...")
+                logger.error("❌ Failed to start demo video, resetting state...")
                 self.is_demo_playing = False
     
-    def monitor_demo_end(self):
-        """Monitor when demo video ends and return to carescape video"""
-        print("🔍 Monitoring demo video for completion...")
+    async def return_to_carescape(self):
+        """Switch back to the looping carescape video after the demo ends"""
+        logger.debug("🔄 Returning to carescape video...")
         
-        while self.is_demo_playing and not self.stop_monitoring.is_set():
-            if self.mpv_process and self.mpv_process.poll() is not None:
-                print("✅ Demo video finished!")
-                print("🔄 Returning to carescape video...")
-                
-                success = self.start_mpv(self.carescape_video, loop=True)
-                if success:
-                    print("✅ Successfully returned to carescape video")
-                else:
-                    print("❌ Failed to restart carescape video")
-                    
-                self.is_demo_playing = False
-                break
-                
-            time.sleep(0.5)
+        success = await self.play_video(self.carescape_video, loop=True)
+        if success:
+            logger.debug("✅ Successfully returned to carescape video")
+        else:
+            logger.error("❌ Failed to restart carescape video")
+            
+        self.is_demo_playing = False
+    
+    async def mpv_event(self, payload):
+        """Handle an MPV end-file event - return to carescape video when the demo reaches its end"""
+        process, message = payload
+        if process is not self.mpv_process or not self.is_demo_playing:
+            return
+            
+        # Other reasons ("stop", "redirect", "quit") come from our own playlist jumps or from shutdown
+        reason = message.get("reason")
+        if reason == "eof":
+            logger.debug("✅ Demo video finished!")
+        elif reason == "error":
+            logger.error("❌ Demo video failed to play: %s", message.get('file_error', 'unknown error'))
+        else:
+            return
+            
+        await self.return_to_carescape()
+    
+    async def mpv_exited(self, process):
+        """Handle an MPV process exit - relaunch carescape video if it was closed during the demo"""
+        # An MPV instance we already stopped - nothing to do
+        if process is not self.mpv_process:
+            return
+            
+        self.close_ipc()
+        self.mpv_process = None
         
-        print("🏁 Demo monitoring thread ended")
+        if not self.is_demo_playing:
+            logger.warning("⚠️  MPV exited (code %s)", process.returncode)
+            return
+            
+        logger.warning("⚠️  MPV closed during demo video")
+        await self.return_to_carescape()
+    
+    async def terminate_mpv(self):
+        """Terminate the running MPV process, force killing it if it does not exit"""
+        self.close_ipc()
+        self.mpv_process.terminate()
+        try:
+            await asyncio.wait_for(self.mpv_process.wait(), timeout=3)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("⚠️  Force killing MPV...")
+            self.mpv_process.kill()
+            await self.mpv_process.wait()
+            return False
     
-    def stop_mpv(self):
+    async def stop_mpv(self):
         """Stop MPV playback (Ctrl+Alt+E)"""
-        if self.mpv_process and self.mpv_process.poll() is None:
-            print("⏹️  Stopping MPV...")
-            self.stop_monitoring.set()
-            self.mpv_process.terminate()
-            try:
-                self.mpv_process.wait(timeout=3)
-                print("✅ MPV stopped")
-            except subprocess.TimeoutExpired:
-                print("⚠️  Force killing MPV...")
-                self.mpv_process.kill()
+        if self.mpv_process and self.mpv_process.returncode is None:
+            logger.info("⏹️  Stopping MPV...")
+            if await self.terminate_mpv():
+                logger.info("✅ MPV stopped")
+            self.mpv_process = None
             self.is_demo_playing = False
         else:
-            print("⚠️  MPV is not running")
+            logger.warning("⚠️  MPV is not running")
     
-    def restart_carescape(self):
+    async def restart_carescape(self):
         """Restart carescape video (Ctrl+Alt+S)"""
-        print("🔄 Restarting carescape video...")
-        self.stop_monitoring.set()
+        logger.debug("🔄 Restarting carescape video...")
         self.is_demo_playing = False
-        success = self.start_mpv(self.carescape_video, loop=True)
+        success = await self.play_video(self.carescape_video, loop=True)
         if success:
-            print("✅ Carescape video restarted")
-            self.stop_monitoring.clear()
+            logger.debug("✅ Carescape video restarted")
         else:
-            print("❌ Failed to restart carescape video")
+            logger.error("❌ Failed to restart carescape video")
+    
+    async def watch_mpv(self, process):
+        """Feed the reactor an event when the given MPV process exits"""
+        await process.wait()
+        self.events.put_nowait(("mpv_exit", process))
+    
+    def post_hotkey(self, name):
+        """Queue a hotkey event for the reactor - safe to call from the hotkey message thread"""
+        self.loop.call_soon_threadsafe(self.events.put_nowait, ("hotkey", name))
+    
+    def create_task(self, coro):
+        """Start a background coroutine, keeping a reference until it completes"""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    async def reactor(self):
+        """Single dispatch loop - handles hotkey and MPV events one at a time, in order"""
+        while True:
+            kind, payload = await self.events.get()
+            try:
+                if kind == "hotkey":
+                    await self.hotkey_handlers[payload]()
+                elif kind == "mpv_event":
+                    await self.mpv_event(payload)
+                elif kind == "mpv_exit":
+                    await self.mpv_exited(payload)
+            except Exception:
+                logger.exception("❌ Error handling %s event", kind)
     
     def setup_flic_hotkey(self):
         """Setup hotkeys for Flic button and manual controls"""
-        try:
-            print("⌨️  Setting up GLOBAL hotkeys...")
-            # CHANGE: Added suppress=False to make hotkeys work globally regardless of focus
-            # This allows hotkeys to work even when other applications are active
-            keyboard.add_hotkey('ctrl+alt+d', self.flic_button_pressed, suppress=False)
-            keyboard.add_hotkey('ctrl+alt+e', self.stop_mpv, suppress=False)
-            keyboard.add_hotkey('ctrl+alt+r', self.restart_carescape, suppress=False)
-            print("✅ Global hotkeys registered successfully")
-            print("   - Ctrl+Alt+D: Toggle demo/carescape")
-            print("   - Ctrl+Alt+E: Stop MPV")
-            print("   - Ctrl+Alt+R: Restart carescape")
-            print("   ⚠️  NOTE: Script must run as ADMINISTRATOR for global hotkeys")
-            return True
-        except Exception as e:
-            print(f"❌ Failed to setup hotkeys: {e}")
-            print("💡 MUST run as administrator for global hotkeys to work!")
+        logger.info("⌨️  Setting up GLOBAL hotkeys...")
+        ready = threading.Event()
+        self.hotkey_thread = threading.Thread(target=self.hotkey_message_loop, args=(ready,), daemon=True)
+        self.hotkey_thread.start()
+        ready.wait()
+        
+        if len(self.hotkey_failures) == len(HOTKEYS):
+            logger.error("❌ Failed to setup hotkeys - are they registered by another application?")
             return False
+        for key in self.hotkey_failures:
+            logger.warning("⚠️  Ctrl+Alt+%s is already registered by another application", key)
+            
+        logger.info("✅ Global hotkeys registered successfully")
+        return True
+    
+    def hotkey_message_loop(self, ready):
+        """Register global hotkeys and pump WM_HOTKEY messages to the reactor (hotkey thread)"""
+        # Count every hotkey as failed until RegisterHotKey says otherwise, so an exception
+        # here is reported as a failure rather than a success
+        self.hotkey_failures = [chr(key) for _, key in HOTKEYS.values()]
+        
+        # Hotkeys belong to the thread that registers them - WM_HOTKEY is only posted to its queue.
+        # Unlike the old keyboard hook (suppress=False), a registered chord is consumed here and
+        # no longer reaches other applications while the script runs
+        try:
+            user32 = ctypes.windll.user32
+            self.hotkey_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            self.hotkey_failures = [
+                chr(key) for hotkey_id, (_, key) in HOTKEYS.items()
+                if not user32.RegisterHotKey(None, hotkey_id, MOD_CONTROL | MOD_ALT | MOD_NOREPEAT, key)
+            ]
+        except Exception:
+            logger.exception("❌ Hotkey registration failed")
+            return
+        finally:
+            ready.set()
+        
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            if msg.message == WM_HOTKEY and msg.wParam in HOTKEYS:
+                self.post_hotkey(HOTKEYS[msg.wParam][0])
+                
+        for hotkey_id in HOTKEYS:
+            user32.UnregisterHotKey(None, hotkey_id)
+    
+    def stop_hotkeys(self):
+        """Stop the hotkey message loop and unregister the hotkeys"""
+        if self.hotkey_thread and self.hotkey_thread.is_alive():
+            ctypes.windll.user32.PostThreadMessageW(self.hotkey_thread_id, WM_QUIT, 0, 0)
+            self.hotkey_thread.join(timeout=1)
+        self.hotkey_thread = None
+    
+    def request_stop(self, *_):
+        """Ask the event loop to shut down - safe to call from signal handlers and other threads"""
+        try:
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+        except RuntimeError:
+            pass  # Loop already closed
+    
+    def on_console_ctrl(self, ctrl_type):
+        """SetConsoleCtrlHandler callback - runs on a thread Windows creates for the event"""
+        self.request_stop()
+        
+        # For these events Windows kills the process once we return - give cleanup a chance to finish
+        if ctrl_type in (CTRL_CLOSE_EVENT, CTRL_LOGOFF_EVENT, CTRL_SHUTDOWN_EVENT):
+            self.stopped.wait(timeout=4)
+        return True
+    
+    def install_stop_handlers(self):
+        """Route Ctrl+C, Ctrl+Break and console close to request_stop"""
+        signal.signal(signal.SIGINT, self.request_stop)
+        
+        if sys.platform == "win32":
+            # Keep a reference - Windows calls back into this ctypes thunk for the life of the process
+            handler_type = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.DWORD)
+            self.console_handler = handler_type(self.on_console_ctrl)
+            if not ctypes.windll.kernel32.SetConsoleCtrlHandler(self.console_handler, True):
+                logger.warning("⚠️  Could not install console control handler")
+    
+    def remove_stop_handlers(self):
+        """Undo install_stop_handlers once cleanup is done"""
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        
+        # Unregister but keep the thunk referenced - a close/logoff callback may still be running in it
+        if self.console_handler is not None:
+            ctypes.windll.kernel32.SetConsoleCtrlHandler(self.console_handler, False)
     
     def run(self):
         """Main run function"""
         print("🎬 Starting Flic Button MPV Controller...")
         print("=" * 50)
         
-        # CHANGE: Added administrator check warning
-        try:
-            import ctypes
-            is_admin = ctypes.windll.shell32.IsUserAnAdmin()
-            if not is_admin:
-                print("⚠️  WARNING: Script is NOT running as Administrator!")
-                print("   Global hotkeys may not work properly.")
-                print("   Right-click the script and select 'Run as administrator'")
-                print()
-        except:
-            pass
-        
-        if not os.path.exists(self.carescape_video):
-            print(f"❌ Error: Carescape video not found: {self.carescape_video}")
-            print(f"📁 Please check that the file exists at this exact path")
+        if not self.carescape_exists:
+            logger.error("❌ Carescape video not found: %s - check that the file exists at this exact path", self.carescape_video)
             return
             
-        if not os.path.exists(self.demo_video):
-            print(f"❌ Error: Demo video not found: {self.demo_video}")
-            print(f"📁 Please check that the file exists at this exact path")
+        if not self.demo_exists:
+            logger.error("❌ Demo video not found: %s - check that the file exists at this exact path", self.demo_video)
             return
         
-        print(f"✅ Carescape video found: {os.path.basename(self.carescape_video)}")
-        print(f"✅ Demo video found: {os.path.basename(self.demo_video)}")
+        logger.info("✅ Carescape video found: %s", self.carescape_basename)
+        logger.info("✅ Demo video found: %s", self.demo_basename)
         
         if not self.find_mpv():
             return
-            
-        print("\n🎥 Starting carescape video on second monitor...")
-        if not self.start_mpv(self.carescape_video, loop=True):
-            print("❌ Failed to start carescape video")
-            return
-        
-        if not self.setup_flic_hotkey():
-            print("❌ Failed to setup hotkey - continuing anyway")
         
-        print(f"\n🖥️  Currently playing on second monitor: {os.path.basename(self.carescape_video)} (looping)")
-        print(f"🎯 Demo video ready: {os.path.basename(self.demo_video)}")
-        print(f"🔊 Carescape volume: {self.carescape_volume}% | Demo volume: {self.demo_volume}%")
-        print("\n🔘 Controls:")
-        print("- Ctrl+Alt+D (Flic button) → Toggle demo/carescape video")
-        print("- Ctrl+Alt+E → Stop MPV")
-        print("- Ctrl+Alt+R → Restart carescape video")
-        print("- Ctrl+C → Exit script completely")
-        print("- Q (in MPV window) → Quit MPV")
-        print("\n✅ System ready! Global hotkeys active (work from any application)")
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print("\n👋 Received exit signal...")
+    
+    async def run_async(self):
+        """Event loop entry point - starts playback and serves hotkeys until exit"""
+        self.loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue()
+        self.stop_event = asyncio.Event()
         
+        # Everything started from here on is torn down by cleanup(), including on a failed startup
         try:
+            self.install_stop_handlers()
+            
+            # pycaw calls are pinned to one MTA thread; handlers only queue them
+            self.start_audio_worker()
+            
+            logger.info("🎥 Starting carescape video on second monitor...")
+            if not await self.play_video(self.carescape_video, loop=True):
+                logger.error("❌ Failed to start carescape video")
+                return
+            
+            if not self.setup_flic_hotkey():
+                logger.warning("❌ Failed to setup hotkey - continuing anyway")
+            
+            print(f"\n🖥️  Currently playing on second monitor: {self.carescape_basename} (looping)")
+            print(f"🎯 Demo video ready: {self.demo_basename}")
+            print(f"🔊 Carescape volume: {self.carescape_volume}% | Demo volume: {self.demo_volume}%")
+            print("\n🔘 Controls:")
+            print("- Ctrl+Alt+D (Flic button) → Toggle demo/carescape video")
+            print("- Ctrl+Alt+E → Stop MPV")
+            print("- Ctrl+Alt+R → Restart carescape video")
+            print("  (these chords are reserved for this script and won't reach other applications)")
+            print("- Ctrl+C → Exit script completely")
+            print("- Q (in MPV window) → Quit MPV")
+            print("\n✅ System ready! Global hotkeys active (work from any application)")
+            
             print("\n⏳ Script running... (Press Ctrl+C to exit)")
-            # CHANGE: Using keyboard.wait() without specific key keeps listener alive for global hotkeys
-            keyboard.wait('ctrl+c')
-        except KeyboardInterrupt:
+            self.create_task(self.reactor())
+            await self.stop_event.wait()
             print("\n👋 Received exit signal...")
         finally:
-            self.cleanup()
+            await self.cleanup()
     
-    def cleanup(self):
+    async def cleanup(self):
         """Clean up resources"""
-        print("\n🛑 Shutting down...")
-        self.stop_monitoring.set()
+        logger.info("🛑 Shutting down...")
+        self.stop_hotkeys()
+        for task in list(self.tasks):
+            task.cancel()
         
-        if self.mpv_process and self.mpv_process.poll() is None:
-            print("⏹️  Terminating MPV...")
-            self.mpv_process.terminate()
-            
-            try:
-                self.mpv_process.wait(timeout=3)
-                print("✅ MPV closed gracefully")
-            except subprocess.TimeoutExpired:
-                print("⚠️  Force killing MPV...")
-                self.mpv_process.kill()
+        if self.mpv_process and self.mpv_process.returncode is None:
+            logger.info("⏹️  Terminating MPV...")
+            if await self.terminate_mpv():
+                logger.info("✅ MPV closed gracefully")
+        
+        self.stop_audio_worker()
+        self.remove_stop_handlers()
                 
-        print("✅ Cleanup complete")
+        logger.info("✅ Cleanup complete")
+        self.stopped.set()
 
 def main():
+    # Unknown KIOSK_LOG values (e.g. "verbose") fall back to WARNING instead of aborting startup
+    log_level = getattr(logging, os.environ.get("KIOSK_LOG", "WARNING").upper(), None)
+    if not isinstance(log_level, int):
+        log_level = logging.WARNING
+    logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s %(message)s")
+    
     carescape_video = r"C:\Users\CareWall\Desktop\Demo\chehaliscare.mp4"
     demo_video = r"C:\Users\CareWall\Desktop\Demo\demo_video.mp4"
     